@@ -0,0 +1,1163 @@
+"""Core of stt: model download, audio capture, decoding and text output"""
+import os
+import queue
+import sys
+import io
+import json
+import re
+import signal
+import socket
+import struct
+import subprocess
+import time
+import zipfile
+import tempfile
+import pyperclip
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import shutil
+import numpy as np
+import termios
+import tty
+# vosk, sounddevice, pynput and requests load native libraries (Kaldi,
+# OpenBLAS, PortAudio, X11) and are imported where first needed so --help,
+# --save-hotkey and early errors stay fast
+
+# --- Constants ---
+SMALL_MODEL_NAME = "vosk-model-small-en-us-0.15"
+LARGE_MODEL_NAME = "vosk-model-en-us-0.22"
+# MemTotal leaves out firmware and kernel reservations, so a 16 GB machine
+# reports roughly 15-15.5 GiB
+LARGE_MODEL_MIN_RAM = 14 * 1024 ** 3  # total RAM needed before 'auto' picks the large model
+MODEL_URL_BASE = "https://alphacephei.com/vosk/models"
+MODEL_DIR = os.path.join(os.path.expanduser("~"), ".cache", "vosk")
+DOWNLOAD_CHUNK = 1024 * 1024
+DOWNLOAD_IN_MEMORY_MAX = 256 * 1024 * 1024  # larger archives go to a temp file
+PROGRESS_INTERVAL = 0.1  # seconds between download progress updates
+EXTRACT_WORKERS = 4
+SAMPLE_RATE = 16000
+CHANNELS = 1
+BLOCK_SIZE = 8000  # largest callback block (in frames) that fits an audio slot
+AUDIO_SLOTS = 64  # preallocated recording buffers shared with the decoder
+VIZ_DOTS = 20  # volume dots at full scale
+VIZ_STATUS_WIDTH = len("⠋ processing ")  # widest status ahead of the dots
+VIZ_RING = 16  # captured blocks buffered for the visualizer thread
+SILENCE_MIN = 20  # mean absolute sample value that always counts as silence
+SILENCE_RATIO = 3  # speech must be this many times above the noise floor
+NOISE_RISE = 0.001  # fraction of the gap the noise floor climbs per louder block
+PREROLL_BYTES = SAMPLE_RATE * 2 * 3 // 10  # 300 ms of silence kept ahead of speech
+POSTROLL_BYTES = PREROLL_BYTES  # silence still fed after the last speech
+BATCH_BYTES = 64 * 1024  # most audio handed to Kaldi in one call (~2 s)
+WARMUP_BYTES = SAMPLE_RATE * 2 // 5  # 200 ms of silence decoded at startup
+DECODER_PRIORITY = 10  # SCHED_RR priority for the decoder thread when allowed
+# Cores (indices into the CPUs the process may use) for the worker threads.
+# The main thread stays unpinned: subprocesses such as xdotool inherit its
+# affinity
+VIZ_CPU = -2
+DECODER_CPU = -1
+
+SPINNER_CHARS = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+CLEAR_LINE = b"\r\033[K"  # carriage return, erase to end of line
+
+DAEMON_START_TIMEOUT = 120  # seconds to wait for a new model server to load its model
+DAEMON_IDLE_EXIT = 30 * 60  # a model server with no clients for this long exits
+
+# Decoder queue markers
+_FLUSH = object()     # finish the current utterance
+_SENTINEL = object()  # shut the decoder thread down
+
+# Vosk results are tiny fixed-shape JSON objects; only "text" is needed.
+# The string body may hold escapes such as \" or \uXXXX
+_TEXT_RE = re.compile(r'"text"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+# Model server protocol: each request is an opcode and a payload length, each
+# reply a payload length, then the payload
+_REQUEST = struct.Struct('!cI')
+_REPLY = struct.Struct('!I')
+
+def total_memory():
+    """Return total physical memory in bytes, or 0 if it can't be determined"""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+def resolve_model_name(choice):
+    """Map 'auto', 'small', 'large' or an explicit Vosk model name to a model name"""
+    if choice == 'small':
+        return SMALL_MODEL_NAME
+    if choice == 'large':
+        return LARGE_MODEL_NAME
+    if choice == 'auto':
+        if total_memory() >= LARGE_MODEL_MIN_RAM:
+            candidates = (LARGE_MODEL_NAME, SMALL_MODEL_NAME)
+        else:
+            candidates = (SMALL_MODEL_NAME,)
+        # A model that is already downloaded beats a surprise 1.8 GB download
+        for name in candidates:
+            if os.path.isdir(os.path.join(MODEL_DIR, name)):
+                return name
+        return candidates[0]
+    return choice
+
+def extract_archive(fileobj, dest):
+    """Extract a zip archive, inflating members in parallel"""
+    with zipfile.ZipFile(fileobj, 'r') as archive:
+        members = archive.infolist()
+        # ZipFile.extract creates missing parents itself, which would race
+        # between workers, so build the directory tree up front
+        dirs = set()
+        for member in members:
+            parts = member.filename.split('/')
+            if not member.is_dir():
+                parts = parts[:-1]
+            parts = [p for p in parts if p not in ('', '.', '..')]
+            if parts:
+                dirs.add(os.path.join(dest, *parts))
+        for path in sorted(dirs):
+            os.makedirs(path, exist_ok=True)
+
+        # zlib releases the GIL while inflating, so members decompress
+        # concurrently; ZipFile serializes the underlying reads itself
+        files = [m for m in members if not m.is_dir()]
+        with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as pool:
+            for _ in pool.map(lambda member: archive.extract(member, dest), files):
+                pass
+
+def member_path(dest, name):
+    """Join an archive member name onto dest, refusing to leave it"""
+    parts = [p for p in name.replace('\\', '/').split('/') if p not in ('', '.')]
+    if name.startswith('/') or '..' in parts or ':' in name:
+        raise ValueError(f"unsafe path in model archive: {name!r}")
+    return os.path.join(dest, *parts)
+
+def stream_extract(members, dest):
+    """Write out (name, size, chunks) members as stream-unzip yields them"""
+    for name, _size, chunks in members:
+        name = name.decode('utf-8')
+        path = member_path(dest, name)
+        if name.endswith('/'):
+            os.makedirs(path, exist_ok=True)
+            # Each member must be drained before the next one is read
+            for _ in chunks:
+                pass
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+def mean_abs(samples, scratch):
+    """Mean absolute value of int16 samples
+
+    The absolute values are written into the caller's int32 scratch buffer
+    (one per thread) and summed with an integer accumulator, so a block costs
+    one pass and no allocation.
+    """
+    size = len(samples)
+    if not size:
+        return 0.0
+    if size > len(scratch):
+        return np.abs(samples, dtype=np.int32).mean()
+    out = scratch[:size]
+    np.abs(samples, out=out, dtype=np.int32)
+    return int(out.sum()) / size
+
+def tune_current_thread(cpu=None, priority=None):
+    """Best-effort pinning and priority boost for the calling thread
+
+    Linux applies both per thread. Other platforms, single-CPU machines and
+    missing privileges all leave the thread as it was.
+    """
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        try:
+            allowed = sorted(os.sched_getaffinity(0))
+            if len(allowed) > 1:
+                os.sched_setaffinity(0, {allowed[cpu % len(allowed)]})
+        except OSError:
+            pass
+    if priority is not None and hasattr(os, 'sched_setscheduler'):
+        try:
+            # Round-robin rather than FIFO: a long decode can't monopolize
+            # its core against other real-time threads of equal priority
+            os.sched_setscheduler(0, os.SCHED_RR, os.sched_param(priority))
+        except OSError:
+            # Real-time scheduling needs root; a nice bump needs less
+            try:
+                os.nice(-5)
+            except OSError:
+                pass
+
+def result_text(result):
+    """The "text" field of a Vosk JSON result, without a full JSON parse"""
+    match = _TEXT_RE.search(result)
+    if not match:
+        return ""
+    text = match.group(1)
+    # Only text with escapes needs the JSON decoder
+    if '\\' in text:
+        text = json.loads(f'"{text}"')
+    return text
+
+class GpuRecognizer:
+    """KaldiRecognizer-style wrapper around Vosk's batched GPU decoder"""
+    def __init__(self, model_path, sample_rate):
+        from vosk import BatchModel, BatchRecognizer, GpuInit
+
+        GpuInit()
+        self._recognizer_class = BatchRecognizer
+        self.model = BatchModel(model_path)
+        self.sample_rate = sample_rate
+        self._rec = BatchRecognizer(self.model, sample_rate)
+        self._texts = []
+
+    def _collect(self):
+        result = self._rec.Result()
+        while result:
+            text = result_text(result)
+            if text:
+                self._texts.append(text)
+            result = self._rec.Result()
+
+    def AcceptWaveform(self, data):
+        self._rec.AcceptWaveform(data)
+        self._collect()
+        # Finished segments are kept here and returned by FinalResult()
+        return False
+
+    def FinalResult(self):
+        self._rec.FinishStream()
+        self.model.Wait()
+        self._collect()
+        return json.dumps({'text': ' '.join(self._texts)}, ensure_ascii=False)
+
+    def Reset(self):
+        # A batch stream can't be restarted once finished
+        self._rec = self._recognizer_class(self.model, self.sample_rate)
+        self._texts = []
+
+def daemon_socket_path(model_name):
+    """Unix socket a model server for model_name listens on"""
+    # XDG_RUNTIME_DIR is private to the user; MODEL_DIR is the fallback
+    base = os.environ.get('XDG_RUNTIME_DIR') or MODEL_DIR
+    return os.path.join(base, f"stt-{model_name}.sock")
+
+def warmed_up(recognizer):
+    """Run a short silent utterance through recognizer and return it"""
+    recognizer.AcceptWaveform(bytes(WARMUP_BYTES))
+    recognizer.FinalResult()
+    recognizer.Reset()
+    return recognizer
+
+class RemoteRecognizer:
+    """KaldiRecognizer-style client for a model held by a model server"""
+    def __init__(self, sock_path):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._sock.connect(sock_path)
+        except OSError:
+            self._sock.close()
+            raise
+        self._file = self._sock.makefile('rwb')
+
+    def _call(self, op, payload=b''):
+        self._file.write(_REQUEST.pack(op, len(payload)))
+        self._file.write(payload)
+        self._file.flush()
+        header = self._file.read(_REPLY.size)
+        if len(header) < _REPLY.size:
+            raise ConnectionError("model server closed the connection")
+        (size,) = _REPLY.unpack(header)
+        return self._file.read(size)
+
+    def AcceptWaveform(self, data):
+        return self._call(b'A', data) == b'1'
+
+    def Result(self):
+        return self._call(b'R').decode()
+
+    def FinalResult(self):
+        return self._call(b'F').decode()
+
+    def Reset(self):
+        self._call(b'Z')
+
+def _serve_client(conn, recognizers):
+    """Decode for one client connection on a pooled recognizer"""
+    rec = recognizers.get()
+    try:
+        with conn, conn.makefile('rwb') as f:
+            while True:
+                header = f.read(_REQUEST.size)
+                if len(header) < _REQUEST.size:
+                    break
+                op, size = _REQUEST.unpack(header)
+                payload = f.read(size)
+                if op == b'A':
+                    reply = b'1' if rec.AcceptWaveform(payload) else b'0'
+                elif op == b'R':
+                    reply = rec.Result().encode()
+                elif op == b'F':
+                    reply = rec.FinalResult().encode()
+                else:
+                    rec.Reset()
+                    reply = b''
+                f.write(_REPLY.pack(len(reply)))
+                f.write(reply)
+                f.flush()
+    except OSError:
+        pass
+    finally:
+        # Recognizers are reused across clients instead of rebuilt
+        rec.Reset()
+        recognizers.put(rec)
+
+def serve_model(model_name):
+    """Load a Vosk model once and decode for stt clients over a Unix socket
+
+    Runs until no client has been connected for DAEMON_IDLE_EXIT seconds.
+    """
+    from vosk import Model, KaldiRecognizer, SetLogLevel
+
+    # Load before binding: until the socket exists, clients keep waiting for
+    # this process, and a failed load ends it with an error they can see
+    SetLogLevel(-1)
+    model = Model(os.path.join(MODEL_DIR, model_name))
+
+    sock_path = daemon_socket_path(model_name)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(sock_path)
+    except OSError:
+        # Another server owns the path, or a dead one left it behind
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(sock_path)
+            return
+        except OSError:
+            os.unlink(sock_path)
+            server.bind(sock_path)
+        finally:
+            probe.close()
+    os.chmod(sock_path, 0o600)
+    server.listen()
+
+    try:
+        server.settimeout(DAEMON_IDLE_EXIT)
+        recognizers = queue.SimpleQueue()
+        pool_size = 0
+        clients = []
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                clients = [t for t in clients if t.is_alive()]
+                if not clients:
+                    break
+                continue
+            conn.settimeout(None)
+            clients = [t for t in clients if t.is_alive()]
+            # One recognizer per concurrent client, kept for later ones
+            if len(clients) >= pool_size:
+                rec = KaldiRecognizer(model, SAMPLE_RATE)
+                rec.SetMaxAlternatives(0)
+                rec.SetPartialWords(False)
+                recognizers.put(rec)
+                pool_size += 1
+            client = threading.Thread(target=_serve_client, args=(conn, recognizers), daemon=True)
+            client.start()
+            clients.append(client)
+    finally:
+        server.close()
+        os.unlink(sock_path)
+
+class SttApp:
+    def __init__(self, mode='type', simulate_enter=False, visualizer=False, hotkey_combo=None, gpu=False, model='auto', silence_level=None, daemon=False):
+        self.mode = mode
+        self.daemon = daemon
+        # None follows the noise floor; 0 feeds every block to the decoder
+        self.silence_level = silence_level
+        self.gpu = gpu
+        self.model_name = resolve_model_name(model)
+        self.model_path = os.path.join(MODEL_DIR, self.model_name)
+        self.simulate_enter = simulate_enter
+        self.visualizer = visualizer
+        self.q = queue.SimpleQueue()
+        # The audio callback copies into rows of this ring and queues the
+        # index, so it never allocates on PortAudio's real-time thread
+        self._rec_ring = np.zeros((AUDIO_SLOTS, BLOCK_SIZE), dtype=np.int16)
+        self._slot_len = [0] * AUDIO_SLOTS
+        self._free = queue.SimpleQueue()
+        for idx in range(AUDIO_SLOTS):
+            self._free.put(idx)
+        self.is_recording = False
+        # Held hotkey keys as bits; parse_hotkey() assigns one bit per key
+        self._pressed_mask = 0
+        self._key_bit = {}
+        self._target_mask = -1
+        self._last_key_bit = 0
+        self.last_transcription = ""
+        self.recognizer = None
+        self._decoder_thread = None
+        self._decoded = threading.Event()
+        self._final_results = []
+        self._session_blocks = 0
+        self.keyboard_controller = None
+        self._type_impl = None  # picked in run() for the display server
+        self.keyboard_listener = None
+        self.mouse_listener = None
+        self.last_toggle_time = 0
+        self._started_recording = threading.Event()
+        # Wakes the idle main loop: hotkey toggles, and level changes that
+        # move the visualizer by at least one dot
+        self._ui_event = threading.Event()
+        self._shown_dots = 0
+        self._stopped_recording = threading.Event()
+        
+        # Load saved config
+        self.config_file = os.path.expanduser("~/.config/stt/config.json")
+        self.load_config(hotkey_combo)
+        
+        
+        # Audio visualization data
+        # Fixed-size ring of recent levels, so the audio callback never grows
+        # or shifts a Python list
+        self.max_audio_history = 200
+        self.audio_data = np.zeros(self.max_audio_history, dtype=np.float32)
+        self._audio_idx = 0
+        self._viz_ring = np.zeros((VIZ_RING, BLOCK_SIZE), dtype=np.int16)
+        self._viz_len = [0] * VIZ_RING
+        self._viz_write = 0
+        self._viz_ready = threading.Event()
+        self._viz_thread = None
+        self.original_settings = None
+
+        # Status lines are rendered once; the main loop only picks a frame.
+        # Minimal mode writes them as pre-encoded bytes, clearing the line first
+        self._status_lines = {
+            'ready': ["\033[92m• ready\033[0m"],  # Green
+            'listening': [f"\033[93m{c} listening\033[0m" for c in SPINNER_CHARS],  # Yellow
+            'processing': [f"\033[91m{c} processing\033[0m" for c in SPINNER_CHARS],  # Red
+        }
+        self._status_frames = {
+            state: [CLEAR_LINE + line.encode() for line in lines]
+            for state, lines in self._status_lines.items()
+        }
+        # The visualizer redraws the top-left line: home, clear, status, then
+        # one of the pre-encoded dot runs
+        self._viz_frames = {
+            state: [b"\033[1;1H\033[K" + line.encode() + b" " for line in lines]
+            for state, lines in self._status_lines.items()
+        }
+        self._viz_dots = ["•".encode() * n for n in range(VIZ_DOTS + 1)]
+        self._on_resize()
+
+    def _on_resize(self, signum=None, frame=None):
+        """Re-read the terminal size; run on SIGWINCH, never per frame"""
+        self.terminal_width, self.terminal_height = shutil.get_terminal_size()
+        # Keep the visualizer line off the last column so it never wraps
+        self._viz_max_dots = max(0, min(VIZ_DOTS, self.terminal_width - VIZ_STATUS_WIDTH - 1))
+        if signum is not None:
+            self._ui_event.set()
+
+    def load_config(self, hotkey_combo):
+        """Load configuration from file or use defaults"""
+        default_hotkey = ['ctrl', 'shift', 'space']
+        
+        if hotkey_combo:
+            # Command line override
+            self.hotkey_combo = hotkey_combo
+        else:
+            # Try to load from config file
+            try:
+                if os.path.exists(self.config_file):
+                    with open(self.config_file, 'r') as f:
+                        config = json.load(f)
+                        self.hotkey_combo = config.get('hotkey', default_hotkey)
+                else:
+                    self.hotkey_combo = default_hotkey
+            except:
+                self.hotkey_combo = default_hotkey
+        self.hotkey_keys = []
+
+    def parse_hotkey(self):
+        """Map the configured hotkey names to pynput keys"""
+        from pynput import keyboard
+
+        self.hotkey_keys = []
+        for key_name in self.hotkey_combo:
+            key_lower = key_name.lower()
+            if key_lower == 'ctrl':
+                self.hotkey_keys.append(keyboard.Key.ctrl)
+            elif key_lower == 'shift':
+                self.hotkey_keys.append(keyboard.Key.shift)
+            elif key_lower == 'alt':
+                self.hotkey_keys.append(keyboard.Key.alt)
+            elif key_lower == 'space':
+                self.hotkey_keys.append(keyboard.Key.space)
+            elif key_lower == 'tab':
+                self.hotkey_keys.append(keyboard.Key.tab)
+            elif key_lower == 'enter':
+                self.hotkey_keys.append(keyboard.Key.enter)
+            elif key_lower.startswith('f') and key_lower[1:].isdigit():
+                # Function keys F1-F12
+                fkey_num = int(key_lower[1:])
+                self.hotkey_keys.append(getattr(keyboard.Key, f'f{fkey_num}'))
+            elif len(key_name) == 1:
+                self.hotkey_keys.append(keyboard.KeyCode.from_char(key_name.lower()))
+
+        # on_press runs on every keystroke system-wide; detection is one mask
+        # compare instead of a set lookup per hotkey key
+        self._key_bit = {}
+        for key in self.hotkey_keys:
+            self._key_bit.setdefault(key, 1 << len(self._key_bit))
+        self._target_mask = sum(self._key_bit.values())
+        self._last_key_bit = self._key_bit[self.hotkey_keys[-1]] if self.hotkey_keys else 0
+        self._pressed_mask = 0
+
+    def save_config(self):
+        """Save current configuration"""
+        try:
+            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
+            config = {
+                'hotkey': self.hotkey_combo
+            }
+            with open(self.config_file, 'w') as f:
+                json.dump(config, f, indent=2)
+        except:
+            pass  # Silently fail if can't save
+
+    def _connect_daemon(self):
+        """Connect to the model server, starting one if none is running"""
+        sock_path = daemon_socket_path(self.model_name)
+        try:
+            return warmed_up(RemoteRecognizer(sock_path))
+        except OSError:
+            pass
+        main_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+        log_path = os.path.join(MODEL_DIR, 'stt-server.log')
+        with open(log_path, 'ab') as log:
+            server = subprocess.Popen([sys.executable, main_script, '--serve', '--model', self.model_name],
+                                      stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+                                      start_new_session=True)
+        deadline = time.monotonic() + DAEMON_START_TIMEOUT
+        while True:
+            time.sleep(0.1)
+            try:
+                return warmed_up(RemoteRecognizer(sock_path))
+            except OSError:
+                # The socket appears once the model has loaded; a server that
+                # lost a start-up race exits and the winner answers
+                if time.monotonic() > deadline:
+                    raise
+                if server.poll() not in (None, 0):
+                    raise RuntimeError(f"model server exited with status {server.returncode}, see {log_path}")
+
+    def _load_recognizer(self):
+        """Load the model in this process, on the GPU when asked and able"""
+        from vosk import Model, KaldiRecognizer
+
+        if self.gpu:
+            try:
+                return GpuRecognizer(self.model_path, SAMPLE_RATE)
+            except Exception as e:
+                print(f"GPU decoding unavailable, using CPU: {e}", file=sys.stderr)
+        recognizer = KaldiRecognizer(Model(self.model_path), SAMPLE_RATE)
+        # Only the final best text is read: no n-best lists and no
+        # partial results, which the decoder never asks for
+        recognizer.SetMaxAlternatives(0)
+        recognizer.SetPartialWords(False)
+        return recognizer
+
+    def _decoder_error(self, e):
+        """Report a decoding failure; replace a model server that went away"""
+        if isinstance(self.recognizer, RemoteRecognizer) and isinstance(e, OSError):
+            print(f"\nModel server lost ({e}), loading the model here", file=sys.stderr)
+            self.recognizer = self._load_recognizer()
+        else:
+            print(f"\nError decoding audio: {e}", file=sys.stderr)
+
+    def _download_chunks(self, r, total_size):
+        """Yield the response body in 1 MiB chunks, printing progress"""
+        import requests
+
+        bytes_downloaded = 0
+        # 1 MiB chunks keep the Python loop out of the way of the transfer;
+        # progress is redrawn at most every 0.1 s
+        last_print = 0.0
+        for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK):
+            yield chunk
+            bytes_downloaded += len(chunk)
+            now = time.monotonic()
+            if now - last_print < PROGRESS_INTERVAL:
+                continue
+            last_print = now
+            if total_size:
+                progress = (bytes_downloaded / total_size) * 100
+                print(f'\rDownloading: {progress:.2f}%', end='')
+            else:
+                print(f'\rDownloading: {bytes_downloaded // DOWNLOAD_CHUNK} MiB', end='')
+        # A dropped connection can end the stream early without an error;
+        # don't accept a truncated archive. (With a Content-Encoding the
+        # header counts encoded bytes.)
+        encoded = r.headers.get('content-encoding', 'identity') != 'identity'
+        if total_size and not encoded and bytes_downloaded != total_size:
+            raise requests.exceptions.RequestException(
+                f"incomplete download, got {bytes_downloaded} of {total_size} bytes")
+        print(f'\rDownloading: done ({bytes_downloaded // DOWNLOAD_CHUNK} MiB)')
+
+    def download_and_unzip_model(self):
+        os.makedirs(MODEL_DIR, exist_ok=True)
+        if not os.path.exists(self.model_path):
+            import requests
+            try:
+                from stream_unzip import stream_unzip
+            except ImportError:
+                stream_unzip = None
+            print(f"Model not found. Downloading {self.model_name}...")
+            # Extract next to the final path and move it into place at the
+            # end, so an interrupted install never looks like a model
+            staging = tempfile.mkdtemp(prefix='.download-', dir=MODEL_DIR)
+            try:
+                with requests.get(f"{MODEL_URL_BASE}/{self.model_name}.zip", stream=True) as r:
+                    r.raise_for_status()
+                    total_size = int(r.headers.get('content-length', 0))
+                    chunks = self._download_chunks(r, total_size)
+                    if stream_unzip is not None:
+                        # Inflate members as the archive arrives; it is never
+                        # held in memory or on disk as a whole
+                        stream_extract(stream_unzip(chunks), staging)
+                    else:
+                        # Hold the archive in memory instead of writing,
+                        # re-reading and deleting a .zip next to the model
+                        if 0 < total_size <= DOWNLOAD_IN_MEMORY_MAX:
+                            buf = io.BytesIO()
+                        else:
+                            # Spool big archives next to the model; /tmp is
+                            # often tmpfs, i.e. RAM again
+                            buf = tempfile.TemporaryFile(dir=MODEL_DIR)
+                        with buf:
+                            for chunk in chunks:
+                                buf.write(chunk)
+                            print("Extracting model...")
+                            extract_archive(buf, staging)
+                os.replace(os.path.join(staging, self.model_name), self.model_path)
+                print("Model ready.")
+            except requests.exceptions.RequestException as e:
+                print(f"\nError downloading model: {e}", file=sys.stderr)
+                sys.exit(1)
+            except Exception as e:
+                print(f"\nError extracting model: {e}", file=sys.stderr)
+                sys.exit(1)
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def audio_callback(self, indata, frames, time, status):
+        # indata is an int16 (frames, channels) array; the stream is mono
+        samples = indata[:, 0]
+        if self.is_recording:
+            idx = None
+            if frames <= BLOCK_SIZE:
+                try:
+                    idx = self._free.get_nowait()
+                except queue.Empty:
+                    pass
+            if idx is None:
+                # Oversized block, or the decoder is behind and every slot is
+                # taken; fall back to a copy
+                self.q.put(samples.tobytes())
+            else:
+                self._rec_ring[idx, :frames] = samples
+                self._slot_len[idx] = frames
+                self.q.put(idx)
+            self._session_blocks += 1
+        
+        # Only copy the block here; the analysis runs on the visualizer thread
+        if self.visualizer:
+            count = min(frames, BLOCK_SIZE)
+            slot = self._viz_write % VIZ_RING
+            self._viz_ring[slot, :count] = samples[:count]
+            self._viz_len[slot] = count
+            self._viz_write += 1
+            self._viz_ready.set()
+
+    def _viz_worker(self):
+        """Turn captured blocks into levels off the audio thread"""
+        tune_current_thread(cpu=VIZ_CPU)
+        read = 0
+        scratch = np.empty(BLOCK_SIZE, dtype=np.int32)
+        while True:
+            self._viz_ready.wait()
+            self._viz_ready.clear()
+            write = self._viz_write
+            # Anything older than the ring has already been overwritten
+            read = max(read, write - VIZ_RING)
+            while read < write:
+                slot = read % VIZ_RING
+                samples = self._viz_ring[slot, :self._viz_len[slot]]
+                read += 1
+
+                # Mean absolute value straight off the int16 samples: no float
+                # copy of the block, no squares or square root
+                level = mean_abs(samples, scratch) / 32768.0
+                self.audio_data[self._audio_idx % self.max_audio_history] = level
+                self._audio_idx += 1
+
+                dots = min(int(level * VIZ_DOTS), self._viz_max_dots)
+                if dots != self._shown_dots:
+                    self._shown_dots = dots
+                    self._ui_event.set()
+
+    def on_press(self, key):
+        bit = self._key_bit.get(key)
+        if bit is None or self._pressed_mask & bit:
+            return
+        self._pressed_mask |= bit
+        
+        # Check if all hotkey keys are pressed
+        if self._pressed_mask == self._target_mask and bit == self._last_key_bit:
+            now = time.time()
+            if now - self.last_toggle_time > 0.3:
+                if not self.is_recording:
+                    self._session_blocks = 0
+                self.is_recording = not self.is_recording
+                self.last_toggle_time = now
+                # Wake the main loop immediately instead of letting it poll
+                if self.is_recording:
+                    self._stopped_recording.clear()
+                    self._started_recording.set()
+                else:
+                    self._started_recording.clear()
+                    self._stopped_recording.set()
+                self._ui_event.set()
+                # Clear any key echo that might appear
+                if not self.visualizer:
+                    sys.stdout.buffer.write(CLEAR_LINE)
+                    sys.stdout.buffer.flush()
+
+    def on_release(self, key):
+        bit = self._key_bit.get(key)
+        if bit:
+            self._pressed_mask &= ~bit
+
+    def on_click(self, x, y, button, pressed):
+        if pressed and self.last_transcription:
+            # Type the text at the click instead of a clipboard round trip:
+            # no xclip/wl-copy subprocess, no settle delay, and the user's
+            # clipboard is left alone
+            self._type_impl(self.last_transcription)
+        return True
+
+    def _pick_typer(self):
+        """Choose how to inject keystrokes, once per run"""
+        # xdotool/ydotool send the whole string as one event stream; pynput
+        # makes a call (and a short sleep) per character
+        if os.environ.get('WAYLAND_DISPLAY') and shutil.which('ydotool'):
+            return self._type_ydotool
+        if os.environ.get('DISPLAY') and shutil.which('xdotool'):
+            return self._type_xdotool
+        return self._type_pynput
+
+    def _type_pynput(self, text):
+        self.keyboard_controller.type(text)
+
+    def _type_command(self, cmd, text):
+        # The text goes through stdin, so its length is not bounded by argv
+        try:
+            subprocess.run(cmd, input=text.encode(), check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"\n{cmd[0]} failed ({e}), typing with pynput instead", file=sys.stderr)
+            self._type_impl = self._type_pynput
+            self._type_pynput(text)
+
+    def _type_xdotool(self, text):
+        self._type_command(['xdotool', 'type', '--delay', '0', '--file', '-'], text)
+
+    def _type_ydotool(self, text):
+        # ydotool needs its ydotoold daemon; without it the fallback kicks in
+        self._type_command(['ydotool', 'type', '--key-delay', '0', '--file', '-'], text)
+
+    def insert_text(self, text):
+        if not text:
+            return
+        self._type_impl(text + ' ')
+        if self.simulate_enter:
+            from pynput.keyboard import Key
+            self.keyboard_controller.press(Key.enter)
+            self.keyboard_controller.release(Key.enter)
+    
+    def draw_vu_meters(self):
+        """Draw classic VU meter visualization"""
+        lines = []
+        
+        # Get current audio level
+        current_level = self.audio_data[(self._audio_idx - 1) % self.max_audio_history]
+        
+        # VU meter settings
+        meter_width = 50
+        filled_blocks = int(current_level * meter_width)
+        
+        # Create the main VU meter
+        meter_line = "  VU │ "
+        
+        # Build the meter bar
+        for i in range(meter_width):
+            if i < filled_blocks:
+                if i < meter_width * 0.6:
+                    meter_line += "\033[92m█\033[0m"  # Green for safe levels
+                elif i < meter_width * 0.8:
+                    meter_line += "\033[93m█\033[0m"  # Yellow for moderate
+                else:
+                    meter_line += "\033[91m█\033[0m"  # Red for high levels
+            else:
+                meter_line += "\033[90m░\033[0m"  # Gray for empty
+        
+        # Add level percentage
+        level_percent = int(current_level * 100)
+        meter_line += f" │ {level_percent:3d}%"
+        
+        lines.append("")
+        lines.append(meter_line)
+        
+        # Add a peak indicator if recording
+        if self.is_recording:
+            peak_line = "     │ "
+            peak_pos = min(filled_blocks, meter_width - 1)
+            for i in range(meter_width):
+                if i == peak_pos and current_level > 0.1:
+                    peak_line += "\033[95m▲\033[0m"  # Magenta peak indicator
+                else:
+                    peak_line += " "
+            peak_line += " │"
+            lines.append(peak_line)
+        
+        lines.append("")
+        
+        return lines
+    
+    def draw_clean_header(self):
+        """Draw a minimal, clean header"""
+        # Format hotkey display
+        hotkey_parts = []
+        for k in self.hotkey_keys:
+            if hasattr(k, 'name'):
+                hotkey_parts.append(k.name.upper())
+            else:
+                key_str = str(k)
+                if 'KeyCode' in key_str:
+                    if 'char=' in key_str:
+                        char = key_str.split("char='")[1].split("'")[0]
+                        hotkey_parts.append(char.upper())
+                else:
+                    hotkey_parts.append(key_str.replace('Key.', '').upper())
+        
+        hotkey_display = '+'.join(hotkey_parts)
+        
+        # Clean header line
+        status_icon = "🔴" if self.is_recording else "⚪"
+        header = f" {status_icon} VOSK STT  │  Hotkey: {hotkey_display}  │  Mode: {self.mode.upper()}"
+        
+        return [header, "─" * len(header)]
+    
+    def draw_clean_status(self):
+        """Draw a clean status line at bottom"""
+        if self.last_transcription:
+            text_preview = self.last_transcription[:60] + "..." if len(self.last_transcription) > 60 else self.last_transcription
+            status = f"💬 \"{text_preview}\""
+        else:
+            status = "💬 Ready to record..."
+        
+        return ["", status]
+    
+    def render_visualizer(self, frame):
+        """Render minimal visualizer with volume dots"""
+        # Get current audio level for dot visualization
+        current_level = self.audio_data[(self._audio_idx - 1) % self.max_audio_history]
+        num_dots = min(int(current_level * VIZ_DOTS), self._viz_max_dots)
+
+        # One write per tick; anything print() buffered goes out first
+        sys.stdout.flush()
+        os.write(sys.stdout.fileno(), frame + self._viz_dots[num_dots])
+
+    def show_status(self, state, frame=0):
+        """Draw the ready/listening/processing status line"""
+        if self.visualizer:
+            frames = self._viz_frames[state]
+            self.render_visualizer(frames[frame % len(frames)])
+        else:
+            frames = self._status_frames[state]
+            sys.stdout.buffer.write(frames[frame % len(frames)])
+            sys.stdout.buffer.flush()
+
+    def run(self):
+        import sounddevice as sd
+        from pynput import keyboard, mouse
+        from pynput.keyboard import Controller
+        from vosk import SetLogLevel
+
+        os.system('cls' if os.name == 'nt' else 'clear')
+        time.sleep(0.05) # Add a small delay to ensure the terminal has time to clear
+        
+        # Disable terminal echo and hide cursor for cleaner display
+        if sys.stdin.isatty():
+            self.original_settings = termios.tcgetattr(sys.stdin)
+            new_settings = termios.tcgetattr(sys.stdin)
+            new_settings[3] = new_settings[3] & ~termios.ECHO  # Disable echo
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, new_settings)
+            
+            # Hide cursor
+            sys.stdout.write('\033[?25l')
+            sys.stdout.flush()
+        
+        # The terminal size only changes on SIGWINCH; the handler runs on
+        # this (main) thread and wakes the UI to redraw
+        if hasattr(signal, 'SIGWINCH'):
+            signal.signal(signal.SIGWINCH, self._on_resize)
+
+        self.parse_hotkey()
+        self.keyboard_controller = Controller()
+        self._type_impl = self._pick_typer()
+        if self.visualizer:
+            self._viz_thread = threading.Thread(target=self._viz_worker, daemon=True)
+            self._viz_thread.start()
+        self.download_and_unzip_model()
+        try:
+            SetLogLevel(-1)
+            if self.daemon:
+                try:
+                    self.recognizer = self._connect_daemon()
+                except Exception as e:
+                    print(f"Model server unavailable, loading the model here: {e}", file=sys.stderr)
+            if self.recognizer is None:
+                self.recognizer = self._load_recognizer()
+        except Exception as e:
+            print(f"Error: Failed to initialize Vosk recognizer: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        self._decoder_thread = threading.Thread(target=self._decoder_worker, daemon=True)
+        self._decoder_thread.start()
+
+        try:
+            sd.check_input_settings(device=None, samplerate=SAMPLE_RATE, channels=CHANNELS)
+        except sd.PortAudioError as e:
+            print(f"Error: Audio device not suitable.", file=sys.stderr)
+            print(f"Please check your microphone. It might not support {SAMPLE_RATE}Hz sample rate or {CHANNELS} channel(s).", file=sys.stderr)
+            print(f"Details: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        if not self.visualizer:
+            # Minimal startup - no messages, just start
+            pass
+
+        self.keyboard_listener = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
+        self.keyboard_listener.start()
+
+        if self.mode == 'mouse_click':
+            self.mouse_listener = mouse.Listener(on_click=self.on_click)
+            self.mouse_listener.start()
+
+        try:
+            # blocksize=0 lets PortAudio deliver audio at the host's native
+            # period instead of waiting for 500 ms blocks
+            with sd.InputStream(samplerate=SAMPLE_RATE, blocksize=0, latency='low',
+                                device=None, dtype='int16', channels=CHANNELS,
+                                callback=self.audio_callback):
+                self.main_loop()
+        except sd.PortAudioError as e:
+            print(f"Error: Could not open audio stream: {e}", file=sys.stderr)
+            print("Please check your microphone connection and system permissions.", file=sys.stderr)
+        except Exception as e:
+            print(f"An unexpected error occurred in the main loop: {e}", file=sys.stderr)
+        finally:
+            self.stop()
+
+    def main_loop(self):
+        spinner_index = 0
+        spinner_tick = 0.05 if self.visualizer else 0.1
+
+        while self.keyboard_listener.is_alive():
+            # IDLE: sleep until the hotkey or a visible level change; the
+            # timeout only notices the keyboard listener going away
+            self.show_status('ready')
+            self._ui_event.wait(timeout=1.0)
+            self._ui_event.clear()
+            if not self._started_recording.is_set():
+                continue
+
+            # RECORDING: animate the spinner until the hotkey stops it
+            while not self._stopped_recording.wait(timeout=spinner_tick):
+                if not self.keyboard_listener.is_alive():
+                    return
+                self.show_status('listening', spinner_index)
+                spinner_index = (spinner_index + 1) % len(SPINNER_CHARS)
+
+            # A quick tap that captured no audio has nothing to decode
+            if not self._session_blocks:
+                continue
+
+            self.show_status('processing', spinner_index)
+            self.process_audio_queue()
+
+    def _decoder_worker(self):
+        """Feed recorded audio to Vosk while the user is still speaking"""
+        # Keep Kaldi on its own core, away from the audio callback
+        tune_current_thread(cpu=DECODER_CPU, priority=DECODER_PRIORITY)
+        # Page in the model and BLAS code while the UI starts up so the first
+        # utterance isn't decoded cold; audio queued meanwhile just waits
+        try:
+            warmed_up(self.recognizer)
+        except Exception as e:
+            self._decoder_error(e)
+        segments = []
+        silence = []
+        silent_bytes = 0
+        trailing = False  # silence follows speech and its post-roll is still owed
+        fed = False
+        # Start the floor at the minimum: a session that opens mid-sentence
+        # would otherwise seed it with speech and gate its first words away
+        noise = SILENCE_MIN
+        scratch = np.empty(BLOCK_SIZE, dtype=np.int32)
+        while True:
+            item = self.q.get()
+            # Drain whatever else is already queued into one buffer so a
+            # backlog reaches Kaldi in a few large calls, not one per block
+            batch = bytearray()
+            while type(item) is int or type(item) is bytes:
+                if type(item) is int:
+                    block = self._rec_ring[item, :self._slot_len[item]]
+                else:
+                    block = np.frombuffer(item, dtype=np.int16)
+
+                # The noise floor drops to any quieter block at once and only
+                # creeps up through louder ones, so speech barely moves it
+                level = mean_abs(block, scratch)
+                if level < noise:
+                    noise = level
+                else:
+                    noise += (level - noise) * NOISE_RISE
+                if self.silence_level is None:
+                    threshold = max(SILENCE_MIN, noise * SILENCE_RATIO)
+                else:
+                    threshold = self.silence_level
+
+                # Hold silent blocks back. Speech is followed by a short
+                # post-roll, fed once the pause is long enough to be one, and
+                # preceded by a short pre-roll; the rest of a pause never
+                # reaches Kaldi
+                if level < threshold:
+                    silence.append(block.tobytes())
+                    silent_bytes += block.nbytes
+                    if trailing and silent_bytes >= POSTROLL_BYTES:
+                        owed = POSTROLL_BYTES
+                        while silence and owed > 0:
+                            pause = silence.pop(0)
+                            silent_bytes -= len(pause)
+                            batch += pause[:owed]
+                            owed -= len(pause)
+                        trailing = False
+                    while not trailing and silence and silent_bytes - len(silence[0]) >= PREROLL_BYTES:
+                        silent_bytes -= len(silence.pop(0))
+                else:
+                    for pause in silence:
+                        batch += pause
+                    silence = []
+                    silent_bytes = 0
+                    trailing = True
+                    # Append the raw bytes; += with the array itself would
+                    # broadcast an addition
+                    batch += block.data
+
+                if type(item) is int:
+                    self._free.put(item)
+                if len(batch) >= BATCH_BYTES:
+                    item = None
+                    break
+                try:
+                    item = self.q.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if batch:
+                fed = True
+                # An endpoint mid-utterance finalizes a segment; collect it now
+                # or the next AcceptWaveform call throws it away. Replayed
+                # pre-roll can push a batch past BATCH_BYTES, so split it
+                try:
+                    for start in range(0, len(batch), BATCH_BYTES):
+                        if self.recognizer.AcceptWaveform(bytes(batch[start:start + BATCH_BYTES])):
+                            segments.append(self.recognizer.Result())
+                except Exception as e:
+                    self._decoder_error(e)
+
+            if item is _SENTINEL:
+                break
+            if item is _FLUSH:
+                # Skip Kaldi's finalization when no audio reached it
+                if fed:
+                    # Feed the post-roll if the pause was too short to have
+                    # fed it: weak final consonants fall under the gate, and
+                    # Kaldi needs right context for the last frames
+                    tail = bytearray()
+                    for pause in silence if trailing else ():
+                        if len(tail) >= POSTROLL_BYTES:
+                            break
+                        tail += pause
+                    try:
+                        if tail and self.recognizer.AcceptWaveform(bytes(tail[:POSTROLL_BYTES])):
+                            segments.append(self.recognizer.Result())
+                        segments.append(self.recognizer.FinalResult())
+                        self.recognizer.Reset()
+                    except Exception as e:
+                        self._decoder_error(e)
+                    fed = False
+                # The rest of the trailing silence is dropped without decoding
+                silence = []
+                silent_bytes = 0
+                trailing = False
+                self._final_results = segments
+                segments = []
+                self._decoded.set()
+
+    def process_audio_queue(self):
+        # Decoding already ran during recording, only the tail is left
+        self._decoded.clear()
+        self.q.put(_FLUSH)
+        # Don't hang on "processing" if the decoder thread has died
+        while not self._decoded.wait(timeout=0.5):
+            if not self._decoder_thread.is_alive():
+                print("\nError: the decoder stopped, nothing to transcribe", file=sys.stderr)
+                return
+
+        texts = [result_text(r).strip() for r in self._final_results]
+        text = ' '.join(t for t in texts if t)
+
+        if text:
+            self.last_transcription = text
+            if self.mode == 'type':
+                self.insert_text(text)
+            elif self.mode == 'copy':
+                pyperclip.copy(text)
+
+    def stop(self):
+        # Restore terminal settings and show cursor
+        if self.original_settings and sys.stdin.isatty():
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self.original_settings)
+            # Show cursor again
+            sys.stdout.write('\033[?25h')
+            sys.stdout.flush()
+        
+        if self._decoder_thread and self._decoder_thread.is_alive():
+            self.q.put(_SENTINEL)
+        if self.keyboard_listener and self.keyboard_listener.is_alive():
+            self.keyboard_listener.stop()
+        if self.mouse_listener and self.mouse_listener.is_alive():
+            self.mouse_listener.stop()
+        print()